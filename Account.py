@@ -1,3 +1,5 @@
+import numpy as np
+
 class account:
     """
     Account Information
@@ -8,34 +10,20 @@ class account:
     ----------
     init_cash : float
         Starting capital
+    n_bars : int
+        Number of trading days
     """
     def __init__(
             self,
-            init_cash: float
+            init_cash: float,
+            n_bars: int
     ) -> None:
 
         self.cash = init_cash
         self.asset_value = 0
 
-        self.daily_account_value = {
-            'Date': [],
-            'Account_Value': []
-        }
-
-    def update_cash(self, cash: float):
-        """
-        Updates available cash
-
-        Parameters
-        ----------
-        cash : float
-            Change in cash
-
-        Returns
-        -------
-        None
-        """
-        self.cash += cash 
+        self.account_value = np.empty(n_bars, dtype = np.float64)
+        self.dates = np.empty(n_bars, dtype = 'datetime64[D]')
 
     def update_asset_value(self, asset_value: float):
         """
@@ -52,22 +40,6 @@ class account:
         """
         self.asset_value: float = asset_value
 
-    def update_daily_account_value(self, date: str):
-        """
-        Updates account value
-
-        Parameters
-        ----------
-        date : string
-            Date of account value
-
-        Returns
-        -------
-        None
-        """
-        self.daily_account_value['Date'].append(date)    
-        self.daily_account_value['Account_Value'].append(self.cash + self.asset_value)
-
 class position:
     """
     Tracks point in time positions
@@ -82,6 +54,5 @@ class position:
             tickers: list[str]
         ) -> None:
         
-        self.position: dict[str, float] = {
-            **{ticker: 0 for ticker in tickers}
-        }
\ No newline at end of file
+        self.qty: np.array = np.zeros(len(tickers), dtype = np.float64)
+        self.ticker_index: dict[str, int] = {ticker: i for i, ticker in enumerate(tickers)}
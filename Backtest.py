@@ -2,12 +2,163 @@ import polars as pl
 import pandas as pd
 import numpy as np
 import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import shared_memory
 from typing import Type
 import matplotlib.pyplot as plt
 from matplotlib import patheffects
 
 import Account
 import Performance
+from _njit import njit
+
+@njit('float64(float32[:, :], int8[:, :], boolean[:], boolean[:], int64[:], float64, float64, float64[:], float64[:])', cache = True)
+def _run_loop(
+        prices: np.array,
+        signals: np.array,
+        has_sell: np.array,
+        has_buy: np.array,
+        buy_counts: np.array,
+        init_cash: float,
+        slippage: float,
+        positions: np.array,
+        account_values: np.array
+    ) -> float:
+    """
+    Compiled trading loop, executes sell signals then buy signals for each trading day
+
+    Parameters
+    ----------
+    prices: np.array
+        [T, K] float32 array of close prices
+    signals: np.array
+        [T, K] array of trade signals
+    has_sell: np.array
+        [T] mask of days with at least one sell signal
+    has_buy: np.array
+        [T] mask of days with at least one buy signal
+    buy_counts: np.array
+        [T] number of buy signals per day
+    init_cash: float
+        Initial capital
+    slippage: float
+        Transaction cost, bid ask spread
+    positions: np.array
+        [K] array of position quantities, updated in place
+    account_values: np.array
+        [T] output array, filled with daily account value
+
+    Returns
+    -------
+    float
+        Final cash
+    """
+    T, K = prices.shape
+    cash = init_cash
+
+    n_held = 0
+    for k in range(K):
+        n_held += positions[k] > 0
+
+    # sell/buy conditions select the updated values so the per ticker loops are branchless
+    for t in range(T):
+        if has_sell[t]:
+            for k in range(K):
+                sell = (signals[t, k] == -1) & (positions[k] > 0)
+                cash += prices[t, k] * positions[k] * (1 - slippage) if sell else 0.0
+                positions[k] = 0.0 if sell else positions[k]
+                n_held -= sell
+
+        if has_buy[t]:
+            # with no open positions every buy signal is eligible
+            if n_held == 0:
+                buy_count = buy_counts[t]
+            else:
+                buy_count = 0
+                for k in range(K):
+                    buy_count += (signals[t, k] == 1) & (positions[k] == 0)
+
+            if cash > 0 and buy_count > 0:
+                cash_allocation = cash / buy_count
+                for k in range(K):
+                    qty = cash_allocation / prices[t, k] if prices[t, k] > 0 else 0.0
+                    take = (signals[t, k] == 1) & (positions[k] == 0) & (qty > 1)
+                    positions[k] = qty if take else positions[k]
+                    cash -= cash_allocation * (1 + slippage) if take else 0.0
+                    n_held += take
+
+        asset_value = 0.0
+        for k in range(K):
+            asset_value += positions[k] * prices[t, k]
+        account_values[t] = cash + asset_value
+
+    return cash
+
+def _signal_masks(signals: np.array) -> tuple[np.array, np.array, np.array]:
+    """
+    Per day sell mask, buy mask and buy signal count of a [T, K] signal matrix
+    """
+    has_sell: np.array = (signals == -1).any(axis = 1)
+    has_buy: np.array = (signals == 1).any(axis = 1)
+    buy_ticker_counts: np.array = (signals == 1).sum(axis = 1, dtype = np.int64)
+    return has_sell, has_buy, buy_ticker_counts
+
+def run_one(
+        prices: np.array,
+        signals: np.array,
+        init_cash: float,
+        slippage: float
+    ) -> tuple[np.array, np.array]:
+    """
+    Runs a single backtest from a fresh account
+
+    Parameters
+    ----------
+    prices: np.array
+        [T, K] array of close prices
+    signals: np.array
+        [T, K] array of trade signals
+    init_cash: float
+        Initial capital
+    slippage: float
+        Transaction cost, bid ask spread
+
+    Returns
+    -------
+    tuple[np.array, np.array]
+        Daily account value and final positions
+    """
+    prices: np.array = np.ascontiguousarray(prices, dtype = np.float32)
+    signals: np.array = np.ascontiguousarray(signals, dtype = np.int8)
+    positions: np.array = np.zeros(prices.shape[1], dtype = np.float64)
+    account_values: np.array = np.empty(prices.shape[0], dtype = np.float64)
+
+    _run_loop(prices, signals, *_signal_masks(signals), float(init_cash), float(slippage), positions, account_values)
+
+    return account_values, positions
+
+def _run_one_shared(
+        shm_specs: dict[str, tuple[str, tuple[int, ...], str]],
+        config: dict
+    ) -> tuple[np.array, np.array]:
+    """
+    Worker for `backtest.run_parameter_sweep`, attaches to the shared price and signal matrices
+    """
+    blocks = {key: shared_memory.SharedMemory(name = name) for key, (name, _, _) in shm_specs.items()}
+    try:
+        prices = np.ndarray(shm_specs['prices'][1], dtype = shm_specs['prices'][2], buffer = blocks['prices'].buf)
+        signals = np.ndarray(shm_specs['signals'][1], dtype = shm_specs['signals'][2], buffer = blocks['signals'].buf)
+
+        result = run_one(prices, signals, config['init_capital'], config['slippage'])
+
+        # views must be released before the blocks can be closed
+        del prices, signals
+        return result
+    finally:
+        for block in blocks.values():
+            block.close()
 
 class backtest:
     """
@@ -44,19 +195,39 @@ class backtest:
             timeframe: list[int]
         ) -> None:
 
-        self.account = Account.account(init_cash = init_capital)
-        self.pos = Account.position(tickers)
         self.pl_df = pl_df[['Date'] + tickers + [col for col in pl_df.columns if 'signal' in col]]
+        self.account = Account.account(init_cash = init_capital, n_bars = len(self.pl_df))
+        self.init_capital = init_capital
+        self.pos = Account.position(tickers)
         self.tickers = tickers
         self.signals = [col for col in pl_df.columns if 'signal' in col]
         self.slippage = slippage
         self.downside_risk = downside_risk
-        self.dates = pl.Series(pl_df['Date'])
+        self.dates_arr = self.pl_df['Date'].to_numpy()
+        # price and signal columns follow the position index so column k is `self.pos.qty[k]`
+        ticker_order: list[str] = sorted(self.pos.ticker_index, key = self.pos.ticker_index.get)
+        self.prices = np.ascontiguousarray(self.pl_df.select(ticker_order).to_numpy(), dtype = np.float32)
+        self.signals_arr = np.ascontiguousarray(self.pl_df.select([f'{ticker}_signal' for ticker in ticker_order]).to_numpy(), dtype = np.int8)
         self.timeframe = timeframe
         self.metrics = metric
         self.charts = chart
 
         self.port_ret = None
+
+        financial_regimes: list[tuple[datetime.datetime, datetime.datetime, str]] = [
+            (pd.to_datetime('2015-07-01'), pd.to_datetime('2015-12-31'), '2015 Chinese Market Crash'),
+            (pd.to_datetime('2018-10-01'), pd.to_datetime('2018-12-24'), '2018 US-China Trade War'),
+            (pd.to_datetime('2020-02-19'), pd.to_datetime('2020-03-23'), '2020 COVID-19'),
+            (pd.to_datetime('2021-11-14'), pd.to_datetime('2022-12-25'), '2022 I/R Hike & Russia-Ukraine War')
+        ]
+        # (start, end, midpoint, label) of each crisis period for `plot_crash`
+        self._regimes: list[tuple[datetime.datetime, datetime.datetime, datetime.datetime, str]] = [
+            (start_date, end_date, start_date + (end_date - start_date) / 2, crisis_label) for start_date, end_date, crisis_label in financial_regimes
+        ]
+
+        self._perf_by_tf = None
+        self._x = None
+        self._y_cache = {}
     
     def run(self):
         """
@@ -74,44 +245,94 @@ class backtest:
         -------
         None
         """
-        for date in self.dates:
-            curr_day: pl.DataFrame = self.pl_df.filter(pl.col('Date') == date)
-            curr_day_signal: pl.DataFrame = curr_day[self.signals]
-
-            buy_signal: int = 1 if ((curr_day_signal == 1).sum_horizontal() > 0).any() else 0
-            sell_signal: int = 1 if ((curr_day_signal == -1).sum_horizontal() > 0).any() else 0
-
-            if sell_signal:
-                for ticker in self.tickers:
-                    if curr_day_signal[f'{ticker}_signal'][-1] == -1 and self.pos.position[ticker] != 0:
-                        sell_value: float = curr_day[ticker][-1] * self.pos.position[ticker]
-                        self.account.update_cash(sell_value * (1 - self.slippage))
-
-                        self.pos.position[ticker] = 0
-            
-            if buy_signal:
-                buy_ticker = []
-                for ticker in self.tickers:
-                    if curr_day_signal[f'{ticker}_signal'][-1] == 1 and self.pos.position[ticker] == 0:
-                        buy_ticker.append(ticker)
-
-                if self.account.cash > 0 and len(buy_ticker) > 0:
-                    cash_allocation: float = self.account.cash / len(buy_ticker)
-                    for ticker in buy_ticker:
-                        curr_price: float = curr_day[ticker][-1]
-                        if cash_allocation / curr_price > 1:
-                            self.pos.position[ticker] = cash_allocation / curr_price
-                            self.account.update_cash(-cash_allocation * (1 + self.slippage))
-            
-            today_asset_value: float = 0.0
-            for ticker in self.tickers:
-                today_asset_value += self.pos.position[ticker] * curr_day[ticker][-1]
-
-            self.account.update_asset_value(today_asset_value)
-            self.account.update_daily_account_value(date)
-
-        self.port_ret: np.array = np.diff(self.account.daily_account_value['Account_Value']) / self.account.daily_account_value['Account_Value'][1:]
-        self.port_ret: np.array = np.pad(self.port_ret, (1, 0), 'constant', constant_values = 0)
+        has_sell, has_buy, buy_ticker_counts = _signal_masks(self.signals_arr)
+
+        self.account.cash = _run_loop(
+            self.prices, self.signals_arr, has_sell, has_buy, buy_ticker_counts,
+            float(self.account.cash), float(self.slippage), self.pos.qty, self.account.account_value
+        )
+
+        self.account.update_asset_value(float(self.pos.qty @ self.prices[-1]))
+        self.account.dates[:] = self.dates_arr
+
+        account_value: np.array = self.account.account_value
+        self.port_ret: np.array = np.empty(len(account_value), dtype = np.float32)
+        self.port_ret[0] = 0.0
+        np.divide(np.diff(account_value), account_value[:-1], out = self.port_ret[1:])
+
+        self._perf_by_tf = None
+
+    def performance_by_timeframe(self) -> dict[int, Type[Performance.performance]]:
+        """
+        Performance of portfolio returns for each timeframe, built once per run
+
+        Parameters
+        ----------
+        None
+
+        Returns
+        -------
+        dict[int, Performance.performance]
+            Performance object keyed by timeframe in years
+        """
+        if self._perf_by_tf is None:
+            self._perf_by_tf = {
+                tf: Performance.performance(self.port_ret, tf) for tf in self.timeframe if len(self.pl_df) > tf
+            }
+
+        return self._perf_by_tf
+
+    def run_parameter_sweep(
+            self,
+            configs: list[dict],
+            max_workers: int = None
+        ) -> list[tuple[np.array, np.array]]:
+        """
+        Runs independent backtests over the same prices and signals in a process pool
+        Price and signal matrices are placed in shared memory so they are not copied per worker
+
+        Parameters
+        ----------
+        configs: list[dict]
+            Backtest configurations, keys `init_capital` and `slippage` default to this backtest's values
+        max_workers: int
+            Number of processes, defaults to the number of CPUs
+
+        Returns
+        -------
+        list[tuple[np.array, np.array]]
+            Daily account value and final positions for each configuration
+
+        Raises
+        ------
+        ValueError
+            If a configuration has keys other than `init_capital` and `slippage`
+        """
+        for config in configs:
+            unknown: set[str] = set(config) - {'init_capital', 'slippage'}
+            if unknown:
+                raise ValueError(f'Unknown sweep config keys: {sorted(unknown)}, expected init_capital and/or slippage')
+
+        configs: list[dict] = [
+            {'init_capital': self.init_capital, 'slippage': self.slippage, **config} for config in configs
+        ]
+
+        blocks: dict[str, shared_memory.SharedMemory] = {}
+        shm_specs: dict[str, tuple[str, tuple[int, ...], str]] = {}
+        try:
+            for key, arr in (('prices', self.prices), ('signals', self.signals_arr)):
+                blocks[key] = shared_memory.SharedMemory(create = True, size = max(arr.nbytes, 1))
+                np.ndarray(arr.shape, dtype = arr.dtype, buffer = blocks[key].buf)[:] = arr
+                shm_specs[key] = (blocks[key].name, arr.shape, arr.dtype.str)
+
+            with ProcessPoolExecutor(max_workers = max_workers or os.cpu_count()) as executor:
+                results = list(executor.map(partial(_run_one_shared, shm_specs), configs))
+        finally:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+
+        return results
 
     def generate_performance(self):
         """
@@ -131,22 +352,26 @@ class backtest:
         """
         compute_port_perf: Type[Performance.performance] = Performance.performance(self.port_ret, 0)
         
-        self.pl_df: pl.DataFrame = self.pl_df.with_columns(
+        cols: list[pl.Series] = [
             pl.Series(name = 'portfolio_cum_ret', values = compute_port_perf.compute_cum_rets()),
             pl.Series(name = 'portfolio_drawdown', values = compute_port_perf.compute_drawdown()),
-        )
+        ]
         
-        for tf in self.timeframe:
-            if len(self.pl_df) > tf:
-                compute_port_perf: Type[Performance.performance] = Performance.performance(self.port_ret, tf)
+        for tf, compute_port_perf in self.performance_by_timeframe().items():
+            cols += [
+                # Sharpe
+                pl.Series(name = f'portfolio_{tf}Y_annualized_sharpe', values = compute_port_perf.compute_rolling_sharpe()),
+
+                # Sortino
+                pl.Series(name = f'portfolio_{tf}Y_annualized_sortino', values = compute_port_perf.compute_rolling_sortino(downside_risk = self.downside_risk))
+            ]
 
-                self.pl_df: pl.DataFrame = self.pl_df.with_columns(
-                    # Sharpe
-                    pl.Series(name = f'portfolio_{tf}Y_annualized_sharpe', values = compute_port_perf.compute_rolling_sharpe()),
+        self.pl_df: pl.DataFrame = self.pl_df.with_columns(cols)
 
-                    # Sortino
-                    pl.Series(name = f'portfolio_{tf}Y_annualized_sortino', values = compute_port_perf.compute_rolling_sortino(downside_risk = self.downside_risk))
-                )
+        # plotting inputs, cum_ret is plotted log scaled
+        self._x: np.array = self.pl_df['Date'].to_numpy()
+        self._y_cache: dict[str, np.array] = {col: self.pl_df[col].to_numpy() for col in self.pl_df.columns if col.startswith('portfolio_')}
+        self._y_cache['portfolio_cum_ret'] = np.log(self._y_cache['portfolio_cum_ret'])
 
     def generate_report(self) -> None:
         '''
@@ -160,23 +385,17 @@ class backtest:
         -------
         None
         '''
+        perf_by_tf: dict[int, Type[Performance.performance]] = self.performance_by_timeframe()
+
         print('--------------BACKTEST REPORT--------------')
         for metric in self.metrics:
-            for tf in self.timeframe:
-                if len(self.pl_df) > tf:
-                    compute_port_perf: Type[Performance.performance] = Performance.performance(self.port_ret, tf)
-
-                    port_cum_ret: np.array = compute_port_perf.compute_annualized_rets()
-                    port_rolling_sharpe: np.array = np.nanmean(compute_port_perf.compute_rolling_sharpe())
-                    port_rolling_sortino: np.array = np.nanmean(compute_port_perf.compute_rolling_sortino(downside_risk = self.downside_risk))
-                    port_maxdd: np.array = compute_port_perf.compute_max_dd()
-                    port_vol: np.array = compute_port_perf.compute_volatility()
-
-                    print(f'T{tf}Y {metric}: {port_cum_ret}%') if metric == 'Annualized Return' else \
-                    print(f'T{tf}Y Average Annualized {metric}: {round(port_rolling_sharpe, 2)}') if metric == 'Sharpe Ratio' else \
-                    print(f'T{tf}Y Average Annualized {metric}: {round(port_rolling_sortino, 2)}') if metric == 'Sortino Ratio' else \
-                    print(f'T{tf}Y {metric}: {port_maxdd}%') if metric == 'Max Drawdown' else \
-                    print(f'T{tf}Y {metric}: {port_vol}%') if metric == 'Volatility' else print('')
+            for tf, compute_port_perf in perf_by_tf.items():
+                # only the requested metric is computed, rolling arrays are cached on `compute_port_perf`
+                print(f'T{tf}Y {metric}: {compute_port_perf.compute_annualized_rets()}%') if metric == 'Annualized Return' else \
+                print(f'T{tf}Y Average Annualized {metric}: {round(np.nanmean(compute_port_perf.compute_rolling_sharpe()), 2)}') if metric == 'Sharpe Ratio' else \
+                print(f'T{tf}Y Average Annualized {metric}: {round(np.nanmean(compute_port_perf.compute_rolling_sortino(downside_risk = self.downside_risk)), 2)}') if metric == 'Sortino Ratio' else \
+                print(f'T{tf}Y {metric}: {compute_port_perf.compute_max_dd()}%') if metric == 'Max Drawdown' else \
+                print(f'T{tf}Y {metric}: {compute_port_perf.compute_volatility()}%') if metric == 'Volatility' else print('')
             print('###############################################')
 
         ############
@@ -228,14 +447,7 @@ class backtest:
         -------
         None
         '''
-        
-        x: np.array = self.pl_df.select('Date').to_numpy().flatten()
-
-        y_port: np.array = self.pl_df.select(f'portfolio_{y}').to_numpy().flatten()
-
-        y_port: np.array = y_port if y != 'cum_ret' else np.log(y_port)
-
-        ax[i].plot(x, y_port, label = 'portfolio', color = 'b')
+        ax[i].plot(self._x, self._y_cache[f'portfolio_{y}'], label = 'portfolio', color = 'b')
         ax[i].set_title(title)
         ax[i].axhline(0 if y != 'cum_ret' else 1, color = 'r', alpha = 0.2, linestyle = 'dashed')
         self.plot_crash(ax, i)
@@ -261,22 +473,15 @@ class backtest:
         None
         '''
 
-        financial_regimes: list[tuple[datetime.datetime, datetime.datetime, str]] = [
-            (pd.to_datetime('2015-07-01'), pd.to_datetime('2015-12-31'), '2015 Chinese Market Crash'),
-            (pd.to_datetime('2018-10-01'), pd.to_datetime('2018-12-24'), '2018 US-China Trade War'),
-            (pd.to_datetime('2020-02-19'), pd.to_datetime('2020-03-23'), '2020 COVID-19'),
-            (pd.to_datetime('2021-11-14'), pd.to_datetime('2022-12-25'), '2022 I/R Hike & Russia-Ukraine War')
-        ]
+        ylo, yhi = ax[i].get_ylim()
+        offset_step: float = yhi / 8 if int(yhi) != 0.0 else -ylo / 8
+        effect = [patheffects.withStroke(linewidth=3, foreground='white')]  # Adding grey outline
+
         # Add shaded areas to indicate financial crisis boundaries
         label_offset: float = 0  # initial offset for label placement
-        for crisis in financial_regimes:
-            start_date, end_date, crisis_label = crisis
+        for start_date, end_date, crisis_midpoint, crisis_label in self._regimes:
             ax[i].axvspan(start_date, end_date, color='red', alpha=0.3)
-            # Calculate midpoint of the crisis period
-            crisis_midpoint: float = start_date + (end_date - start_date) / 2
             # Shift label down by a certain offset
-            effect = [patheffects.withStroke(linewidth=3, foreground='white')]  # Adding grey outline
-            ax[i].text(crisis_midpoint, ax[i].get_ylim()[1]*0.9 - label_offset, crisis_label, verticalalignment='top', horizontalalignment='center', path_effects=effect)
+            ax[i].text(crisis_midpoint, yhi*0.9 - label_offset, crisis_label, verticalalignment='top', horizontalalignment='center', path_effects=effect)
 
-            offset = ax[i].get_ylim()[1] / 8 if int(ax[i].get_ylim()[1]) != 0.0 else -ax[i].get_ylim()[0] / 8
-            label_offset += offset  # increase offset for the next label    
+            label_offset += offset_step  # increase offset for the next label
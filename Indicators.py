@@ -35,15 +35,14 @@ class indicators:
         pl.DataFrame
             Polars DataFrame with columns as SMA of tickers
         """
-        pl_sma: pl.DataFrame = self.pl_df.drop('Date').with_columns(
-            pl.all().rolling_mean(window_size = int(window))
-        )
-
-        pl_sma.columns = [col + '_sma' for col in pl_sma.columns]
+        price_cols: list[str] = [col for col in self.pl_df.columns if col != 'Date']
+        sma_cols: list[str] = [col + '_sma' for col in price_cols]
 
-        self.pl_df: pl.DataFrame = pl.concat([self.pl_df, pl_sma], how = 'horizontal')
+        self.pl_df: pl.DataFrame = self.pl_df.with_columns(
+            pl.col(col).rolling_mean(window_size = int(window)).alias(sma_col) for col, sma_col in zip(price_cols, sma_cols)
+        )
 
-        return pl_sma
+        return self.pl_df.select(sma_cols)
 
     def compute_bbands(
             self,
@@ -64,12 +63,13 @@ class indicators:
         -------
         None
         """
-        pl_sma: pl.DataFrame = self.pl_df.select([col for col in self.pl_df.columns if 'sma' in col])
-
-        pl_upper_bands: pl.DataFrame = pl_sma + std * pl_sma.with_columns(pl.all().rolling_std(window_size = window))
-        pl_lower_bands: pl.DataFrame = pl_sma - std * pl_sma.with_columns(pl.all().rolling_std(window_size = window)) 
-
-        pl_upper_bands.columns = [col.replace('_sma', '') + f'_{std}_upper_band' for col in pl_upper_bands.columns]
-        pl_lower_bands.columns = [col.replace('_sma', '') + f'_{std}_lower_band' for col in pl_lower_bands.columns]
+        sma_cols: list[str] = [col for col in self.pl_df.columns if 'sma' in col]
+        std_cols: list[str] = [col + '_rolling_std' for col in sma_cols]
 
-        self.pl_df: pl.DataFrame = pl.concat([self.pl_df, pl_upper_bands, pl_lower_bands], how = 'horizontal')
+        # rolling std is computed once and shared by the upper and lower bands
+        self.pl_df: pl.DataFrame = self.pl_df.with_columns(
+            pl.col(col).rolling_std(window_size = window).alias(std_col) for col, std_col in zip(sma_cols, std_cols)
+        ).with_columns(
+            [(pl.col(col) + std * pl.col(std_col)).alias(col.replace('_sma', '') + f'_{std}_upper_band') for col, std_col in zip(sma_cols, std_cols)]
+            + [(pl.col(col) - std * pl.col(std_col)).alias(col.replace('_sma', '') + f'_{std}_lower_band') for col, std_col in zip(sma_cols, std_cols)]
+        ).drop(std_cols)
@@ -1,6 +1,33 @@
-import polars as pl
+from functools import cached_property
+
 import numpy as np
 
+def _cumsum(a: np.array) -> np.array:
+    # prefix sums with a leading zero, accumulated in float64 whatever the input precision
+    c = np.zeros(len(a) + 1, dtype = np.float64)
+    np.cumsum(a, dtype = np.float64, out = c[1:])
+    return c
+
+def _rolling_mean(a: np.array, w: int) -> np.array:
+    c = _cumsum(a)
+    return (c[w:] - c[:-w]) / w
+
+def _rolling_std(a: np.array, w: int) -> np.array:
+    # sample std (ddof = 1) from windowed sums and sums of squares
+    c1 = _cumsum(a)
+    c2 = _cumsum(a * a)
+    s1 = c1[w:] - c1[:-w]
+    s2 = c2[w:] - c2[:-w]
+    var = (s2 - s1 * s1 / w) / (w - 1)
+    return np.sqrt(np.maximum(var, 0))
+
+def _rolling_semi_dev(a: np.array, w: int, threshold: float) -> np.array:
+    # root mean squared shortfall below `threshold`, averaged over the below-threshold observations only
+    below = a < threshold
+    c_neg_sq = _cumsum(np.where(below, (a - threshold) ** 2, 0.0))
+    c_neg_n = _cumsum(below)
+    return np.sqrt((c_neg_sq[w:] - c_neg_sq[:-w]) / np.maximum(c_neg_n[w:] - c_neg_n[:-w], 1))
+
 class performance:
     """
     Computes performance of portfolio        
@@ -14,7 +41,7 @@ class performance:
     Parameters
     ----------
     portfolio_ret : np.array
-        Array of portfolio returns
+        Array of portfolio returns, held as float32 and reduced with float64 accumulators
     years : int
         Trailing Years
     """
@@ -28,62 +55,83 @@ class performance:
         self.trade_days = 252
         self.timeframe = self.years * self.trade_days
         
+        portfolio_ret = np.asarray(portfolio_ret).astype(np.float32, copy = False)
+
         self.portfolio_ret = portfolio_ret[-self.timeframe : ]
 
         self.rolling = portfolio_ret
 
+        self._rolling_sortino: dict[float, np.array] = {}
+
     def compute_cum_rets(self) -> np.array:
-        return np.cumprod(self.rolling + 1)
+        return np.cumprod(self.rolling + 1, dtype = np.float64)
     
-    def compute_annualized_rets(self) -> float:
-        annualized_return = np.prod(1 + self.portfolio_ret) ** (self.trade_days / self.timeframe) - 1
+    @cached_property
+    def _annualized_rets(self) -> float:
+        annualized_return = np.prod(1 + self.portfolio_ret, dtype = np.float64) ** (self.trade_days / self.timeframe) - 1
         return round(annualized_return * 100, 2)
 
+    def compute_annualized_rets(self) -> float:
+        return self._annualized_rets
+
     def compute_sharpe(self) -> float:
-        sharpe = self.portfolio_ret.mean(axis = 0) / self.portfolio_ret.std(axis = 0) * np.sqrt(self.trade_days)
+        sharpe = self.portfolio_ret.mean(axis = 0, dtype = np.float64) / self.portfolio_ret.std(axis = 0, dtype = np.float64) * np.sqrt(self.trade_days)
         return np.round(sharpe, 2)
-    
-    def compute_rolling_sharpe(self) -> list[float]:
+
+    @cached_property
+    def _padded_rolling_mean(self) -> np.array:
         pad = np.zeros(self.timeframe - 1)
-        rolling_mean = np.convolve(self.rolling, np.ones(self.timeframe) / self.timeframe, mode='valid')
-        rolling_mean = np.concatenate((pad, rolling_mean), axis = 0)
-        rolling_std = pl.Series(self.rolling).rolling_std(self.timeframe).to_numpy()
+        return np.concatenate((pad, _rolling_mean(self.rolling, self.timeframe)), axis = 0)
+
+    @cached_property
+    def _rolling_sharpe(self) -> np.array:
+        rolling_std = _rolling_std(self.rolling, self.timeframe)
+        rolling_std = np.concatenate((np.full(self.timeframe - 1, np.nan), rolling_std), axis = 0)
 
-        rolling_sharpe = (rolling_mean / rolling_std) * np.sqrt(self.trade_days)
+        rolling_sharpe = (self._padded_rolling_mean / rolling_std) * np.sqrt(self.trade_days)
         return np.round(rolling_sharpe, 2)
 
+    def compute_rolling_sharpe(self) -> list[float]:
+        return self._rolling_sharpe
+
     def compute_sortino(self, downside_risk: float) -> float:
-        downside_ret = np.where(self.portfolio_ret < downside_risk, self.portfolio_ret, 0)
-        downside_std = downside_ret.std(axis = 0)
-        sortino = self.portfolio_ret.mean(axis = 0) / downside_std * np.sqrt(self.trade_days)
+        below = self.portfolio_ret < downside_risk
+        downside_std = np.sqrt(np.sum((self.portfolio_ret[below] - downside_risk) ** 2, dtype = np.float64) / max(np.sum(below), 1))
+        sortino = self.portfolio_ret.mean(axis = 0, dtype = np.float64) / downside_std * np.sqrt(self.trade_days)
         return np.round(sortino, 2)
     
     def compute_rolling_sortino(self, downside_risk: float) -> list[float]:
-        pad = np.zeros(self.timeframe - 1)
-        rolling_mean = np.convolve(self.rolling, np.ones(self.timeframe) / self.timeframe, mode='valid')
-        rolling_mean = np.concatenate((pad, rolling_mean), axis = 0)
+        if downside_risk not in self._rolling_sortino:
+            rolling_downside_ret = _rolling_semi_dev(self.rolling, self.timeframe, downside_risk)
+            rolling_downside_ret = np.concatenate((np.full(self.timeframe - 1, np.nan), rolling_downside_ret), axis = 0)
 
-        downside_ret = np.where(self.rolling < downside_risk, self.rolling, 0)
-        rolling_downside_ret = pl.Series(downside_ret).rolling_std(self.timeframe).to_numpy()
+            rolling_sortino = (self._padded_rolling_mean / rolling_downside_ret) * np.sqrt(self.trade_days)
+            self._rolling_sortino[downside_risk] = np.round(rolling_sortino, 2)
 
-        rolling_sortino = (rolling_mean / rolling_downside_ret) * np.sqrt(self.trade_days)
-        
-        return np.round(rolling_sortino, 2)
+        return self._rolling_sortino[downside_risk]
 
-    def compute_max_dd(self) -> float:
-        cum_ret = np.cumprod(1 + self.portfolio_ret)   
-        cum_roll_max = np.maximum.accumulate(cum_ret)
-        drawdowns = cum_roll_max - cum_ret
-        max_drawdown = np.max(drawdowns / cum_roll_max)
-        return round(max_drawdown * 100, 2)
-    
-    def compute_drawdown(self) -> list[float]:
-        cum_ret = np.cumprod(1 + self.portfolio_ret)
+    @cached_property
+    def _dd(self) -> np.array:
+        cum_ret = np.cumprod(1 + self.portfolio_ret, dtype = np.float64)
         peak = np.maximum.accumulate(cum_ret)
-        
         return cum_ret / peak - 1
+
+    @cached_property
+    def _max_dd(self) -> float:
+        # 0.0 - dd rather than -dd, so a window with no drawdown reports 0.0 and not -0.0
+        max_drawdown = np.max(0.0 - self._dd)
+        return round(max_drawdown * 100, 2)
+
+    def compute_max_dd(self) -> float:
+        return self._max_dd
     
+    def compute_drawdown(self) -> list[float]:
+        return self._dd
+
+    @cached_property
+    def _volatility(self) -> float:
+        vol = self.portfolio_ret.std(dtype = np.float64) * np.sqrt(self.trade_days)
+        return np.round(vol * 100, 2)
+
     def compute_volatility(self) -> float:
-        vol = self.portfolio_ret.std() * np.sqrt(self.trade_days)
-        return np.round(vol * 100, 2)  
-    
\ No newline at end of file
+        return self._volatility
@@ -36,13 +36,8 @@ class strategy():
         None
         """
         self.pl_df = self.pl_df.with_columns(
-            pl.when(
-                pl.col(f'{col}') > pl.col(f'{col}_1_upper_band'),
-                pl.col(f'{col}') < pl.col(f'{col}_2_upper_band')
-            ).then(1).otherwise(
-                pl.when(
-                    pl.col(f'{col}') < pl.col(f'{col}_1_lower_band'),
-                    pl.col(f'{col}') > pl.col(f'{col}_2_lower_band')
-                ).then(-1).otherwise(0)
+            (
+                ((pl.col(f'{col}') > pl.col(f'{col}_1_upper_band')) & (pl.col(f'{col}') < pl.col(f'{col}_2_upper_band'))).fill_null(False).cast(pl.Int8)
+                - ((pl.col(f'{col}') < pl.col(f'{col}_1_lower_band')) & (pl.col(f'{col}') > pl.col(f'{col}_2_lower_band'))).fill_null(False).cast(pl.Int8)
             ).alias(f'{col}_signal') for col in self.tickers
         )
@@ -37,8 +37,11 @@ class ticker_info:
         -------
         Polars Dataframe
         """
-        close_price: pd.DataFrame = yf.download(tickers = self.tickers, start = start_date, end = end_date)['Adj Close'].reset_index()
-        pl_close_price: pl.DataFrame = pl.from_dataframe(close_price)
+        close_price: pd.DataFrame = yf.download(tickers = self.tickers, start = start_date, end = end_date, progress = False, threads = True)['Adj Close']
+        close_price: pd.DataFrame = close_price.reset_index().rename_axis(None, axis = 1)
+
+        # Arrow backed conversion, avoids the dataframe interchange protocol
+        pl_close_price: pl.DataFrame = pl.from_pandas(close_price, rechunk = False)
         pl_close_price: pl.DataFrame = pl_close_price.with_columns(pl.col('Date').cast(pl.Date))
 
         return pl_close_price.drop_nulls()
\ No newline at end of file
@@ -0,0 +1,15 @@
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """
+        Fallback when numba is not installed, runs the decorated function as plain Python
+        Supports both `@njit` and `@njit(...)` usage
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator